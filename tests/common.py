@@ -1,12 +1,16 @@
 """Helper functions for SAP Commissions PyTests."""
 import csv
+import functools
 import re
-from collections.abc import Generator
+from collections import Counter
+from collections.abc import Callable, Generator
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
 from typing import Final, Optional
 
 import pytest
+from pytest_dependency import depends
 
 REMAINDER: Final[str] = "__REMAINDER__"
 FILENAME_PATTERN: Final[re.Pattern] = re.compile(
@@ -15,58 +19,127 @@ FILENAME_PATTERN: Final[re.Pattern] = re.compile(
 )
 NUMBER_PATTERN: Final[re.Pattern] = re.compile(r"^-?[0-9]+(\.[0-9]+)?$")
 DATE_PATTERN: Final[re.Pattern] = re.compile(r"^\d{1,2}/\d{1,2}/\d{4}$")
-BOOL_PATTERN: Final[re.Pattern] = re.compile(r"^[01]{1}$")
+BOOLEAN_VALUES: Final[frozenset[str]] = frozenset(("", "0", "1"))
+
+# A check is sent every row of a file, followed by `None` after the last row.
+Check = Generator[None, Optional[list[str]], None]
+# Failure message per check, `None` if the check passed.
+Outcome = dict[str, Optional[str]]
 
 
 class PathManager:
     """Utilize properties and cache for paths that don't change,
     reducing redundant path computations"""
-    @property
+    @functools.cached_property
     def fixture_path(self) -> Path:
-        if not hasattr(self, "_fixture_path"):
-            self._fixture_path = Path(__file__).parent.parent / "fixtures"
-        return self._fixture_path
+        return Path(__file__).parent.parent / "fixtures"
 
-    @property
+    @functools.cached_property
     def source_path(self) -> Path:
-        if not hasattr(self, "_source_path"):
-            self._source_path = Path(__file__).parent.parent / "source"
-        return self._source_path
+        return Path(__file__).parent.parent / "source"
 
 
 path_manager = PathManager()
 
 
-def load_header(template: str) -> list[str]:
+@functools.lru_cache(maxsize=None)
+def load_header(template: str) -> tuple[str, ...]:
     """Load a header file."""
     header_text = (
         (path_manager.fixture_path / "headers" / f"{template}.txt")
         .read_text(encoding="utf-8")
     )
-    headers = header_text.splitlines()[0].split("\t")
+    headers = tuple(header_text.splitlines()[0].split("\t"))
     assert template in headers, f"Template name {template} not found in headers"
     return headers
 
 
-def source_files(template: Optional[str] = None) -> list[Path]:
+@functools.lru_cache(maxsize=None)
+def source_files(template: Optional[str] = None) -> tuple[Path, ...]:
     """Get a list of txt files for the specified template.
 
     Return all txt files if no template specified."""
-    template_upper = template.upper() if template else ""
-    return [
-        file for file in path_manager.source_path.iterdir()
-        if file.suffix.upper() == ".TXT"
-        and (not template or template_upper in file.name.upper())
-    ]
+    files = path_manager.source_path.glob("*.[tT][xX][tT]")
+    if not template:
+        return tuple(files)
+
+    search = re.compile(re.escape(template), re.IGNORECASE).search
+    return tuple(file for file in files if search(file.name))
+
+
+def key_getter(positions: list[int]) -> Callable[[list[str]], tuple[str, ...]]:
+    """Return a callable that picks the values at positions from a row.
+
+    The values are always returned as a tuple, also for a single position."""
+    if len(positions) == 1:
+        position = positions[0]
+        return lambda row: (row[position],)
+    return itemgetter(*positions)
+
+
+def good_file_dependency(file: Path) -> str:
+    """Return the dependency name of `test_good_file` for a file.
+
+    Tests using the `source` fixture are skipped unless it passed."""
+    return f"good_file[{file.name}]"
 
 
 class Bootstrap:
     """Inject fixtures based in template."""
     template: str
+    checks: tuple[str, ...] = ()
 
-    def _source_files(self) -> list[Path]:
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _source_files(cls) -> tuple[Path, ...]:
         """Return a list of files matching the template."""
-        return source_files(self.template)
+        return source_files(cls.template)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _scan(cls, file: Path) -> Outcome:
+        """Run all checks in a single pass over the file.
+
+        Every check is a generator `_check_<name>` that is sent one row at a
+        time and raises on the first invalid row. The outcome is cached so all
+        tests on the same file share one pass."""
+        headers: tuple[str, ...] = load_header(cls.template)
+        index: dict[str, int] = {column: i for i, column in enumerate(headers)}
+        outcome: Outcome = dict.fromkeys(cls.checks)
+        running: dict[str, Check] = {}
+        for name in cls.checks:
+            check: Check = getattr(cls, f"_check_{name}")(index)
+            try:
+                next(check)
+            except StopIteration:
+                continue
+            except Exception as err:
+                # E.g. a column that is not in the header, only fail this check.
+                outcome[name] = f"{type(err).__name__}: {err}"
+                continue
+            running[name] = check
+
+        def send(row: Optional[list[str]]) -> None:
+            for name, check in tuple(running.items()):
+                try:
+                    check.send(row)
+                except StopIteration:
+                    del running[name]
+                except AssertionError as err:
+                    outcome[name] = str(err)
+                    del running[name]
+
+        with open(file, "r", encoding="utf-8", newline="") as f_out:
+            for row in csv.reader(f_out, delimiter="\t"):
+                if not row:
+                    continue
+                if len(row) < len(headers):
+                    row += [""] * (len(headers) - len(row))
+                send(row)
+                if not running:
+                    break
+        send(None)
+        return outcome
 
     @pytest.fixture
     def file(self, request: pytest.FixtureRequest) -> Path:
@@ -74,19 +147,12 @@ class Bootstrap:
         return request.param
 
     @pytest.fixture
-    def source(
-        self,
-        request: pytest.FixtureRequest,
-    ) -> Generator[csv.DictReader, None, None]:
-        """Sourcefile with fieldnames."""
-        headers: list[str] = load_header(self.template)
-        with open(request.param, "r", encoding="utf-8") as f_out:
-            yield csv.DictReader(
-                f_out,
-                delimiter="\t",
-                fieldnames=headers,
-                restkey="__REMAINDER__",
-            )
+    def source(self, request: pytest.FixtureRequest) -> Outcome:
+        """Outcome of all checks on the sourcefile.
+
+        Skip the test if `test_good_file` did not pass for the same file."""
+        depends(request, [good_file_dependency(request.param)], scope="class")
+        return self._scan(request.param)
 
 
 class GenericTests(Bootstrap):
@@ -96,8 +162,15 @@ class GenericTests(Bootstrap):
     numbers: list[str] = []
     dates: list[str] = []
     booleans: list[str] = []
+    checks: tuple[str, ...] = (
+        "pk_columns",
+        "required_columns",
+        "number_format",
+        "date_format",
+        "boolean_format",
+        "unittype_if_number",
+    )
 
-    @pytest.mark.dependency(name="good_file")
     def test_good_file(self, file: Path) -> None:
         """Test readable file.
 
@@ -116,104 +189,158 @@ class GenericTests(Bootstrap):
         - The file is to contain no header rows.
         """
         filename: str = file.name
-        assert FILENAME_PATTERN.match(filename), f"Filename {filename} does not match the required pattern"
-
-        file_content: str = file.read_text("utf-8")
-        assert file_content, "File is empty or encoding is not unicode"
-
-        file_lines = file_content.splitlines()
-        assert all("\t" in line for line in file_lines), "File not tab-delimited"
-
-        headers: list[str] = load_header(self.template)
-        first_line = file_lines[0].split("\t")
-        assert all(
-            item not in headers for item in first_line
-        ), "File has header row"
-
-    @pytest.mark.dependency(depends=["good_file"])
-    def test_pk_columns(self, source: csv.DictReader) -> None:
+        assert filename.endswith(".txt") and FILENAME_PATTERN.fullmatch(filename), \
+            f"Filename {filename} does not match the required pattern"
+
+        headers: tuple[str, ...] = load_header(self.template)
+        with open(file, "r", encoding="utf-8") as f_out:
+            first_line: str = f_out.readline()
+            assert first_line, "File is empty or encoding is not unicode"
+            assert "\t" in first_line, "File not tab-delimited"
+            assert all(
+                item not in headers
+                for item in first_line.rstrip("\n").split("\t")
+            ), "File has header row"
+
+            for line in f_out:
+                assert "\t" in line, "File not tab-delimited"
+
+    @classmethod
+    def _check_pk_columns(cls, index: dict[str, int]) -> Check:
+        """Primary key columns are filled and unique."""
+        if not (primary_key := cls.primary_key):
+            return
+
+        get_pk = key_getter([index[column] for column in primary_key])
+        pks: list[tuple] = []
+        while (row := (yield)) is not None:
+            pk = get_pk(row)
+            assert all(pk), \
+                f"Primary key empty {dict(zip(primary_key, pk))}"
+            pks.append(pk)
+        duplicates = [pk for pk, count in Counter(pks).items() if count > 1]
+        assert not duplicates, \
+            f"File has one or more rows with the same primary key {duplicates[:10]}"
+
+    @classmethod
+    def _check_required_columns(cls, index: dict[str, int]) -> Check:
+        """Required columns are filled."""
+        required = cls.required
+        positions = [index[column] for column in required]
+        while (row := (yield)) is not None:
+            for i in positions:
+                assert row[i], \
+                    "Required column empty " \
+                    f"{ {column: row[i] for column, i in zip(required, positions)} }"
+
+    @classmethod
+    def _check_number_format(cls, index: dict[str, int]) -> Check:
+        """Number values are in US format."""
+        numbers = cls.numbers
+        positions = [index[column] for column in numbers]
+        match = NUMBER_PATTERN.match
+        while (row := (yield)) is not None:
+            for i in positions:
+                value = row[i]
+                # Whole numbers are settled without the regex engine.
+                assert not value or (value.isascii() and value.isdigit()) \
+                    or match(value), \
+                    "Number value must be in format 12345.67 " \
+                    f"{ {column: row[i] for column, i in zip(numbers, positions) if row[i]} }"
+
+    @classmethod
+    def _check_date_format(cls, index: dict[str, int]) -> Check:
+        """Date values are in format of MM/DD/YYYY."""
+        dates = cls.dates
+        positions = [index[column] for column in dates]
+        match = DATE_PATTERN.match
+        strptime = datetime.strptime
+        date_format = "%m/%d/%Y"
+        while (row := (yield)) is not None:
+            for i in positions:
+                if not (value := row[i]):
+                    continue
+                try:
+                    # strptime alone also accepts space padded values.
+                    if not match(value):
+                        raise ValueError
+                    strptime(value, date_format)
+                except ValueError:
+                    raise AssertionError(
+                        "Date value must be in format of MM/DD/YYYY "
+                        f"{ {column: row[i] for column, i in zip(dates, positions) if row[i]} }"
+                    ) from None
+
+    @classmethod
+    def _check_boolean_format(cls, index: dict[str, int]) -> Check:
+        """Boolean values are either 0, 1 or empty."""
+        booleans = cls.booleans
+        positions = [index[column] for column in booleans]
+        while (row := (yield)) is not None:
+            for i in positions:
+                assert row[i] in BOOLEAN_VALUES, \
+                    "Boolean value must be either 0, 1 or empty " \
+                    f"{ {column: row[i] for column, i in zip(booleans, positions) if row[i]} }"
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _number_unittype_pairs(cls) -> tuple[tuple[str, str], ...]:
+        """Return each number column with its UNITTYPEFOR column."""
+        return tuple((number, f"UNITTYPEFOR{number}") for number in cls.numbers)
+
+    @classmethod
+    def _check_unittype_if_number(cls, index: dict[str, int]) -> Check:
+        """Unit Type is provided with the corresponding number."""
+        numbertypes = [
+            (number, index[number], index[unittype])
+            for number, unittype in cls._number_unittype_pairs()
+        ]
+        while (row := (yield)) is not None:
+            for _, n, u in numbertypes:
+                if row[n] or row[u]:
+                    assert row[n] and row[u], \
+                        "Unit Type is required if corresponding number is provided " \
+                        f"{ {number: (row[n], row[u]) for number, n, u in numbertypes if row[n] or row[u]} }"
+
+    def test_pk_columns(self, source: Outcome) -> None:
         """Test primary key columns are filled and unique."""
-        if not (primary_key := self.primary_key):
+        if not self.primary_key:
             pytest.skip(
                 f"{self.template} does not have any primary key columns.")
 
-        rows: int = 0
-        pks: set[tuple] = set()
-        for row in source:
-            assert all(row[column] for column in primary_key), \
-                "Primary key empty " \
-                f"{ {column: row[column] for column in primary_key} }"
-            rows += 1
-            pks.add(tuple(row[column] for column in primary_key))
-        assert len(pks) == rows, \
-            "File has one or more rows with the same primary key"
-
-    @pytest.mark.dependency(depends=["good_file"])
-    def test_required_columns(self, source: csv.DictReader) -> None:
+        assert (failure := source["pk_columns"]) is None, failure
+
+    def test_required_columns(self, source: Outcome) -> None:
         """Test required columns are filled."""
-        if not (required := self.required):
+        if not self.required:
             pytest.skip(f"{self.template} does not have any required columns.")
 
-        for row in source:
-            assert all(row[column] for column in required), \
-                "Required column empty " \
-                f"{ {column: row[column] for column in required} }"
+        assert (failure := source["required_columns"]) is None, failure
 
-    @pytest.mark.dependency(depends=["good_file"])
-    def test_number_format(self, source: csv.DictReader) -> None:
+    def test_number_format(self, source: Outcome) -> None:
         """All number values must be in US format."""
-        if not (numbers := self.numbers):
+        if not self.numbers:
             pytest.skip(f"{self.template} does not have any number columns.")
 
-        for row in source:
-            assert all(
-                NUMBER_PATTERN.match(row[column])
-                for column in numbers
-                if row[column]
-            ), "Number value must be in format 12345.67 " \
-                f"{ {column: row[column] for column in numbers if row[column]} }"
-
-    @pytest.mark.dependency(depends=["good_file"])
-    def test_date_format(self, source: csv.DictReader) -> None:
+        assert (failure := source["number_format"]) is None, failure
+
+    def test_date_format(self, source: Outcome) -> None:
         """All date values must be in format of MM/DD/YYYY."""
-        if not (dates := self.dates):
+        if not self.dates:
             pytest.skip("Template does not have date columns.")
 
-        for row in source:
-            assert all(
-                DATE_PATTERN.match(row[column])
-                and datetime.strptime(row[column], "%m/%d/%Y")
-                for column in dates
-                if row[column]
-            ), "Date value must be in format of MM/DD/YYYY "\
-                f"{ {column: row[column] for column in dates if row[column]} }"
-
-    @pytest.mark.dependency(depends=["good_file"])
-    def test_boolean_format(self, source: csv.DictReader) -> None:
+        assert (failure := source["date_format"]) is None, failure
+
+    def test_boolean_format(self, source: Outcome) -> None:
         """All boolean values must be either 0, 1 or empty."""
-        if not (booleans := self.booleans):
+        if not self.booleans:
             pytest.skip(f"{self.template} does not have any boolean columns.")
 
-        for row in source:
-            assert all(
-                BOOL_PATTERN.match(row[column])
-                for column in booleans
-                if row[column]
-            ), "Boolean value must be either 0, 1 or empty "\
-                f"{ {column: row[column] for column in booleans if row[column]} }"
-
-    @pytest.mark.dependency(depends=["good_file"])
-    def test_unittype_if_number(self, source: csv.DictReader) -> None:
+        assert (failure := source["boolean_format"]) is None, failure
+
+    def test_unittype_if_number(self, source: Outcome) -> None:
         """Unit Type is required if corresponding number is provided."""
-        if not (numbers := self.numbers):
+        if not self.numbers:
             pytest.skip(f"{self.template} does not have any number columns.")
 
-        unittypes = [f"UNITTYPEFOR{column}" for column in numbers]
-        numbertypes = list(zip(numbers, unittypes))
-        for row in source:
-            assert all(
-                row[number] and row[unittype]
-                for number, unittype in numbertypes
-                if row[number] or row[unittype]
-            ), "Unit Type is required if corresponding number is provided " \
-                f"{ {number: (row[number], row[unittype]) for number, unittype in numbertypes if row[number] or row[unittype]} }"
+        assert (failure := source["unittype_if_number"]) is None, failure
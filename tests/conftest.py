@@ -1,23 +1,45 @@
 """Fixtures for SAP Commissions PyTests."""
+from pathlib import Path
+
 import pytest
 
+from .common import good_file_dependency
+
 
 def pytest_generate_tests(metafunc: pytest.Metafunc):
     # This hook is called for every test function/method that needs to be parametrized
     cls = metafunc.cls
     if cls and hasattr(cls, '_source_files'):
-        files = cls._source_files(cls)
+        files = cls._source_files()
+        # Keep all tests of a file on the same xdist worker, so they share the
+        # single pass over the file that is cached in that worker.
         if 'file' in metafunc.fixturenames:
             metafunc.parametrize(
                 argnames="file",
-                argvalues=files,
+                argvalues=[
+                    pytest.param(file, marks=_file_marks(metafunc, file))
+                    for file in files
+                ],
                 indirect=True,
                 ids=lambda f: f.name,
             )
         if 'source' in metafunc.fixturenames:
             metafunc.parametrize(
                 argnames="source",
-                argvalues=files,
+                argvalues=[
+                    pytest.param(file, marks=pytest.mark.xdist_group(file.name))
+                    for file in files
+                ],
                 indirect=True,
                 ids=lambda f: f.name,
             )
+
+
+def _file_marks(metafunc: pytest.Metafunc, file: Path) -> list[pytest.MarkDecorator]:
+    """Marks for a test parametrized with `file`."""
+    marks = [pytest.mark.xdist_group(file.name)]
+    if metafunc.function.__name__ == "test_good_file":
+        # Name the dependency per file. The default name is derived from the
+        # node id, which xdist changes when grouping.
+        marks.append(pytest.mark.dependency(name=good_file_dependency(file)))
+    return marks
@@ -1,21 +1,25 @@
 """Tests for ODI Template: TXSTA."""
 import csv
+from collections import Counter
 from pathlib import Path
 from typing import Final
 
 import pytest
 
-from .common import GenericTests, source_files, load_header
+from .common import Check, GenericTests, key_getter, source_files, load_header
 
 TXSTA: Final[str] = "TXSTA"
 TXTA: Final[str] = "TXTA"
 
+_TXSTA_FILES: Final[tuple[Path, ...]] = source_files(TXSTA)
+_TXTA_FILES: Final[tuple[Path, ...]] = source_files(TXTA)
+
 
 # Skip this entire module if there are no TX(S)TA files in source.
 pytestmark = pytest.mark.skipif(
     (
-        len(source_files(TXSTA)) == 0
-        and len(source_files(TXTA)) == 0
+        len(_TXSTA_FILES) == 0
+        and len(_TXTA_FILES) == 0
     ),
     reason="No TXSTA or TXTA files found."
 )
@@ -23,8 +27,8 @@ pytestmark = pytest.mark.skipif(
 
 def txsta_txta_files() -> list[tuple[Path, Path]]:
     """Return a list of matching TXSTA and TXTA files from source."""
-    all_txsta = {file.name: file for file in source_files(TXSTA)}
-    all_txta = {file.name: file for file in source_files(TXTA)}
+    all_txsta = {file.name: file for file in _TXSTA_FILES}
+    all_txta = {file.name: file for file in _TXTA_FILES}
 
     matching_files: list[tuple[Path, Path]] = []
     for txsta_filename, txsta_file in all_txsta.items():
@@ -34,13 +38,16 @@ def txsta_txta_files() -> list[tuple[Path, Path]]:
     return matching_files
 
 
+_TXSTA_TXTA_PAIRS: Final[list[tuple[Path, Path]]] = txsta_txta_files()
+
+
 class TestTXSTA_TXTA:
     """Tests for TXSTA / TXTA file sets."""
 
     def test_file_pairs(self) -> None:
         """Test existence of TXSTA and TXTA file sets."""
-        txsta: list[Path] = tuple(file.name for file in source_files(TXSTA))
-        txta: list[Path] = tuple(file.name for file in source_files(TXTA))
+        txsta: tuple[str, ...] = tuple(file.name for file in _TXSTA_FILES)
+        txta: tuple[str, ...] = tuple(file.name for file in _TXTA_FILES)
 
         assert all(
             file.replace(TXSTA, TXTA) in txta for file in txsta
@@ -51,49 +58,49 @@ class TestTXSTA_TXTA:
 
     @pytest.mark.parametrize(
         ("txsta_file", "txta_file"),
-        txsta_txta_files(),
+        _TXSTA_TXTA_PAIRS,
         ids=lambda f: f.name
     )
     def test_txsta_in_txta(self, txsta_file: Path, txta_file: Path) -> None:
         """Test every transaction in TXSTA has at least one assignment in TXTA."""
-        txsta_reader = csv.reader(
-            txsta_file.read_text("utf-8").splitlines(),
-            delimiter="\t",
-        )
-        txta_reader = csv.reader(
-            txta_file.read_text("utf-8").splitlines(),
-            delimiter="\t",
-        )
-
-        txta_keys = [tuple(row[:4]) for row in txta_reader]
-        assert all(
-            tuple(row[:4]) in txta_keys for row in txsta_reader
-        ), "Every transaction in TXSTA should have at least one assignment in TXTA"
+        with open(txta_file, "r", encoding="utf-8", newline="") as f_txta:
+            txta_reader = csv.reader(f_txta, delimiter="\t")
+            txta_keys = {tuple(row[:4]) for row in txta_reader}
+
+        with open(txsta_file, "r", encoding="utf-8", newline="") as f_txsta:
+            txsta_reader = csv.reader(f_txsta, delimiter="\t")
+            missing = [
+                key for row in txsta_reader
+                if (key := tuple(row[:4])) not in txta_keys
+            ]
+        assert not missing, \
+            "Every transaction in TXSTA should have at least one assignment in TXTA " \
+            f"{missing[:10]}"
 
     @pytest.mark.parametrize(
         ("txsta_file", "txta_file"),
-        txsta_txta_files(),
+        _TXSTA_TXTA_PAIRS,
         ids=lambda f: f.name
     )
     def test_txta_in_txsta(self, txsta_file: Path, txta_file: Path) -> None:
         """Test every assignment in TXTA is joined by a transaction in TXSTA."""
-        txsta_content = txsta_file.read_text("utf-8").splitlines()
-        txta_content = txta_file.read_text("utf-8").splitlines()        
-        
-        txsta_reader = csv.reader(txsta_content, delimiter="\t")
-        txta_reader = csv.reader(txta_content, delimiter="\t")
-
-        txsta_keys = {tuple(row[:4]) for row in txsta_reader}
-        txta_keys = {tuple(row[:4]) for row in txta_reader}
-        
+        with open(txsta_file, "r", encoding="utf-8", newline="") as f_txsta:
+            txsta_reader = csv.reader(f_txsta, delimiter="\t")
+            txsta_keys = {tuple(row[:4]) for row in txsta_reader}
+
+        with open(txta_file, "r", encoding="utf-8", newline="") as f_txta:
+            txta_reader = csv.reader(f_txta, delimiter="\t")
+            txta_keys = {tuple(row[:4]) for row in txta_reader}
+
         assert txta_keys.issubset(txsta_keys), "Every assignment in TXTA should have a corresponding transaction in TXSTA"
 
     def test_template_in_headers(self) -> None:
         """Test that the template name is present in the file headers."""
-        for file in source_files():
-            headers = load_header(file.stem.split('_')[1])
+        templates = {file.stem.split('_')[1] for file in _TXSTA_FILES + _TXTA_FILES}
+        for template in sorted(templates):
+            headers = load_header(template)
             assert TXSTA in headers or TXTA in headers, \
-                f"Template name {TXSTA} or {TXTA} not found in headers of {file.name}"
+                f"Template name {TXSTA} or {TXTA} not found in headers of {template}"
 
 class TestTXSTA(GenericTests):
     """Tests for individual TXSTA files."""
@@ -179,38 +186,42 @@ class TestTXTA(GenericTests):
         "GENERICBOOLEAN6",
     ]
 
-    @pytest.mark.dependency(depends=["good_file"])
-    def test_pk_columns(self, source: csv.DictReader) -> None:
-        """Test primary key columns."""
-        primary_key = self.primary_key
-        all_pk = primary_key + self.required
-        pa, pat, po, title = self.required
-
-        rows: int = 0
-        pks: set[tuple] = set()
-        duplicates: list[tuple] = []
-        for row in source:
-            assert all(row[column] for column in primary_key), \
-                "Primary key empty " \
-                f"{ {column: row[column] for column in primary_key} }"
-
-            pk_dict = {column: row[column] for column in all_pk}
-            assert any(row[column] for column in [pa, po, title]), \
-                f"One of {[pa, po, title]} is required {pk_dict}"
-            if row[pa]:
-                assert row[pat], f"{pat} is required if {pa} is provided {pk_dict}"
-            rows += 1
-            if (pk := tuple(pk_dict.values())) in pks:
-                duplicates.append(pk)
-            pks.add(pk)
-        assert len(pks) == rows, \
-            f"File has one or more rows with the same primary key {duplicates}"
-
-    @pytest.mark.dependency(depends=["good_file"])
-    def test_required_columns(self, source: csv.DictReader) -> None:
-        """Test required columns are filled."""
-        required = self.required
-        for row in source:
-            assert any(row[column] for column in required), \
-                "Required column empty " \
-                f"{ {column: row[column] for column in required} }"
+    @classmethod
+    def _check_pk_columns(cls, index: dict[str, int]) -> Check:
+        """Primary key columns."""
+        primary_key = cls.primary_key
+        all_pk = primary_key + cls.required
+        get_pk = key_getter([index[column] for column in all_pk])
+        pa, pat, po, title = cls.required
+        i_pa, i_pat, i_po, i_title = (index[column] for column in cls.required)
+        size = len(primary_key)
+
+        pks: list[tuple] = []
+        while (row := (yield)) is not None:
+            pk = get_pk(row)
+            assert all(pk[:size]), \
+                f"Primary key empty {dict(zip(primary_key, pk))}"
+            assert row[i_pa] or row[i_po] or row[i_title], \
+                f"One of {[pa, po, title]} is required {dict(zip(all_pk, pk))}"
+            if row[i_pa]:
+                assert row[i_pat], \
+                    f"{pat} is required if {pa} is provided {dict(zip(all_pk, pk))}"
+            pks.append(pk)
+        duplicates = [pk for pk, count in Counter(pks).items() if count > 1]
+        assert not duplicates, \
+            f"File has one or more rows with the same primary key {duplicates[:10]}"
+
+    @classmethod
+    def _check_required_columns(cls, index: dict[str, int]) -> Check:
+        """Required columns are filled."""
+        required = cls.required
+        positions = [index[column] for column in required]
+        while (row := (yield)) is not None:
+            for i in positions:
+                if row[i]:
+                    break
+            else:
+                raise AssertionError(
+                    "Required column empty "
+                    f"{ {column: row[i] for column, i in zip(required, positions)} }"
+                )